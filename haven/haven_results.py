@@ -463,16 +463,18 @@ def get_best_exp_dict(exp_list, savedir_base, reduce_score, reduce_mode, return_
             if best_score >= score:
                 best_score = score
                 exp_dict_best = exp_dict
+                exp_id_best = exp_id
         else:
             score = pd.DataFrame(score_list)[reduce_score].max()
             if best_score <= score:
                 best_score = score
                 exp_dict_best = exp_dict
+                exp_id_best = exp_id
         scores_dict += [{'score':score, 'epochs':len(score_list), 'exp_id':exp_id}]
 #     print(best_score)
     if exp_dict_best is None:
         return {}
-    scores_dict += [{'exp_id':hu.hash_dict(exp_dict_best), 'best_score':best_score}]
+    scores_dict += [{'exp_id':exp_id_best, 'best_score':best_score}]
     if return_scores:
         return exp_dict_best, scores_dict
     # print(reduce_score, scores_dict)
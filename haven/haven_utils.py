@@ -19,17 +19,27 @@ import scipy.io as io
 import pandas as pd
 from datetime import datetime
 import pytz
-import threading
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                as_completed)
 import pylab as plt
 import subprocess
+import shutil
 import shlex 
 import numpy as np
 import contextlib
 import json
 import sys
+import re
 import scipy
 from skimage.segmentation import mark_boundaries
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# hash function used to create exp_ids, see set_hash_backend
+_HASH = hashlib.md5
 
 def get_longest_list(listOfLists):
     LL = listOfLists
@@ -78,35 +88,12 @@ def cartesian_exp_group(exp_config):
 
     """
     # Create the cartesian product
-    exp_config_copy = copy.deepcopy(exp_config)
-    
-    for k,v in exp_config_copy.items():
-        if not isinstance(exp_config_copy[k], list):
-            exp_config_copy[k] = [v]
-
-    exp_list_raw = (dict(zip(exp_config_copy.keys(), values))
-                    for values in itertools.product(*exp_config_copy.values()))
+    keys = list(exp_config.keys())
+    values = [v if isinstance(v, list) else [v] for v in exp_config.values()]
 
-    # Convert into a list
-    exp_list = []
-    for exp_dict in exp_list_raw:
-        exp_list += [exp_dict]
+    exp_list = [dict(zip(keys, combo)) for combo in itertools.product(*values)]
     return exp_list
 
-def hash_dict(dictionary):
-    """Create a hash for a dictionary."""
-    dict2hash = ""
-
-    for k in sorted(dictionary.keys()):
-        if isinstance(dictionary[k], dict):
-            v = hash_dict(dictionary[k])
-        else:
-            v = dictionary[k]
-
-        dict2hash += "%s_%s_" % (str(k), str(v))
-
-    return hashlib.md5(dict2hash.encode()).hexdigest()
-
 # =======================================================
 # checkpoint helpers
 class CheckpointManager:
@@ -167,8 +154,9 @@ class CheckpointManager:
         return save_dict
 
 def create_checkpoint(savedir, exp_dict):
-    save_json(savedir + "/exp_dict.json", exp_dict)
-    save_json(savedir + "/run_dict.json", {"started at":time_to_montreal()})
+    save_json_bulk([(savedir + "/exp_dict.json", exp_dict),
+                    (savedir + "/run_dict.json",
+                     {"started at":time_to_montreal()})])
     # print("Saved: %s" % savedir)
 
 def delete_checkpoint(savedir):
@@ -210,12 +198,6 @@ def load_pkl(fname):
     with open(fname, "rb") as f:
         return pickle.load(f)
 
-def load_json(fname, decode=None):
-    with open(fname, "r") as json_file:
-        d = json.load(json_file)
-
-    return d
-
 # def torch_save(fname, obj):
 #     """"Save data in torch format."""
 #     # Define names of temporal files
@@ -249,16 +231,31 @@ def save_pkl(fname, data, with_rename=True):
     create_dirs(fname)
 
     # Save file
+    _write_pkl(fname, data, with_rename)
+
+def save_pkl_bulk(items, with_rename=True):
+    """Save many (fname, data) pairs, checking each folder only once."""
+    _save_bulk(items, _write_pkl, with_rename)
+
+def _save_bulk(items, writer, *args):
+    """Call writer(fname, data, *args) for each (fname, data) pair."""
+    dirname_set = set()
+    for fname, data in items:
+        dirname = os.path.dirname(fname)
+        if dirname not in dirname_set:
+            create_dirs(fname)
+            dirname_set.add(dirname)
+        writer(fname, data, *args)
+
+def _write_pkl(fname, data, with_rename):
     if with_rename:
         fname_tmp = fname + "_tmp.pth"
         with open(fname_tmp, "wb") as f:
-            pickle.dump(data, f)
-        if os.path.exists(fname):
-            os.remove(fname)
-        os.rename(fname_tmp, fname)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(fname_tmp, fname)
     else:
         with open(fname, "wb") as f:
-            pickle.dump(data, f)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
 #
 # def torch_save(fname, obj, with_rename=True):
 #     """"Save data in torch format."""
@@ -280,28 +277,17 @@ def save_pkl(fname, data, with_rename=True):
 #         with open(fname, "wb") as f:
 #             torch.save(obj, f)
 
-def create_dirs(fname):
-    """Create folders."""
-    # If it is a filename do nothing
-    if "/" not in fname:
-        return
-
-    # If the folder do not exist, create it
-    if not os.path.exists(os.path.dirname(fname)):
-        print(os.path.dirname(fname))
-        os.makedirs(os.path.dirname(fname))
 
+try:
+    from zoneinfo import ZoneInfo
+    _MONTREAL_TZ = ZoneInfo('America/Montreal')
+except (ImportError, KeyError):
+    # python < 3.9 or no tz database on the system
+    _MONTREAL_TZ = pytz.timezone('America/Montreal')
 
-def time_to_montreal():  # TODO: Remove commented code
+def time_to_montreal():
     """Get time in Montreal zone."""
-    # Get time
-    ts = time.time()
-
-    tz = pytz.timezone('America/Montreal')
-    # dt = aware_utc_dt.astimezone(tz)
-    dt = datetime.fromtimestamp(ts, tz)
-
-    return dt.strftime("%I:%M %p (%b %d)")
+    return datetime.now(_MONTREAL_TZ).strftime("%I:%M %p (%b %d)")
 
 def n2t(x, dtype="float"):
     if isinstance(x, (int, np.int64, float)):
@@ -337,13 +323,13 @@ def get_image(imgs,
             return visFigure(fig, win=win)
             
 
-    imgs = denormalize(imgs, mode=denorm)
     if isinstance(imgs, PIL.Image.Image):
         imgs = np.array(imgs)
     if isinstance(mask, PIL.Image.Image):
         mask = np.array(mask)
 
-    imgs = t2n(imgs).copy()
+    # denormalize already returns a new numpy array
+    imgs = denormalize(imgs, mode=denorm)
     imgs = l2f(imgs)
 
     if pointList is not None and len(pointList):
@@ -456,21 +442,6 @@ def bbox_yxyx_2_mask(bbox, h, w):
 
     return mask
 
-def t2n(x):
-    if isinstance(x, (int, float)):
-        return x
-    if isinstance(x, torch.autograd.Variable):
-        x = x.cpu().data.numpy()
-
-    if isinstance(x, (torch.cuda.FloatTensor, torch.cuda.IntTensor,
-                      torch.cuda.LongTensor, torch.cuda.DoubleTensor)):
-        x = x.cpu().numpy()
-
-    if isinstance(x, (torch.FloatTensor, torch.IntTensor, torch.LongTensor,
-                      torch.DoubleTensor)):
-        x = x.numpy()
-
-    return x
 
 def scatter_plot(X, color, fig=None, title=""):
     if fig is None:
@@ -563,46 +534,49 @@ def l2f(X):
 
     return X
 
+# mean/std used by denormalize, shaped to broadcast over (C, H, W) and
+# (N, C, H, W) images
+_RGB_MU = np.array([0.485, 0.456, 0.406]).reshape(3, 1, 1)
+_RGB_VAR = np.array([0.229, 0.224, 0.225]).reshape(3, 1, 1)
+_BGR_MU = np.array([102.9801, 115.9465, 122.7717]).reshape(3, 1, 1)
+_BGR_VAR = np.ones((3, 1, 1))
+_BASIC_MU = np.full((3, 1, 1), 0.5)
+_BASIC_VAR = np.full((3, 1, 1), 0.5)
+
 def _denorm(image, mu, var, bgr2rgb=False):
-    if image.ndim == 3:
-        result = image * var[:, None, None] + mu[:, None, None]
-        if bgr2rgb:
-            result = result[::-1]
+    if image.ndim != 3:
+        mu, var = mu[np.newaxis], var[np.newaxis]
+
+    if np.broadcast(image, var).shape == image.shape:
+        # image is updated in place
+        np.multiply(image, var, out=image)
+        np.add(image, mu, out=image)
     else:
-        result = image * var[None, :, None, None] + mu[None, :, None, None]
-        if bgr2rgb:
-            result = result[:, ::-1]
-    return result
+        # e.g. a single channel image broadcast to 3 channels
+        image = image * var + mu
+    if bgr2rgb:
+        if image.ndim == 3:
+            image = image[::-1]
+        else:
+            image = image[:, ::-1]
+    return image
 
 
 def denormalize(img, mode=0):
-    # _img = t2n(img)
-    # _img = _img.copy()
-    image = t2n(img).copy().astype("float")
+    # astype returns a new array, so _denorm can work in place
+    image = t2n(img).astype("float")
 
     if mode in [1, "rgb"]:
-        mu = np.array([0.485, 0.456, 0.406])
-        var = np.array([0.229, 0.224, 0.225])
-        # (0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
-        image = _denorm(image, mu, var)
+        image = _denorm(image, _RGB_MU, _RGB_VAR)
 
     elif mode in [2, "bgr"]:
-        mu = np.array([102.9801, 115.9465, 122.7717])
-        var = np.array([1, 1, 1])
-        image = _denorm(image, mu, var, bgr2rgb=True).clip(0, 255).round()
+        image = _denorm(image, _BGR_MU, _BGR_VAR, bgr2rgb=True)
+        np.clip(image, 0, 255, out=image)
+        np.round(image, out=image)
 
     elif mode in [3, "basic"]:
-        mu = np.array([0.5, 0.5, 0.5])
-        var = np.array([0.5, 0.5, 0.5])
-
-        image = _denorm(image, mu, var)
-    # else:
-
-    #     mu = np.array([0.,0.,0.])
-    #     var = np.array([1,1,1])
+        image = _denorm(image, _BASIC_MU, _BASIC_VAR)
 
-    #     image = _denorm(image, mu, var)
-    # print(image)
     return image
 
 
@@ -729,8 +703,6 @@ def save_image(fname, img):
         img_pil = Image.fromarray(img)
         img_pil.save(fname)
     else:
-        os.makedirs(os.path.dirname(fname), exist_ok=True)
-        images = f2l(t2n(img))
         imsave(fname , img)
 
 def f2l(X):
@@ -771,14 +743,16 @@ def gray2cmap(gray, cmap="jet", thresh=0):
 def imsave(fname, arr, size=None):
     from PIL import Image
     arr = f2l(t2n(arr)).squeeze()
-    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    create_dirs(fname)
     #print(arr.shape)
     if size is not None:
         arr = Image.fromarray(arr)
         arr = arr.resize(size)
         arr = np.array(arr)
     # scipy.misc.imsave(fname, arr)
-    img = PIL.Image.fromarray(np.uint8(arr * 255))
+    # arr is usually a transposed view; produce a C-contiguous uint8 array
+    # here so PIL doesn't make another copy of it
+    img = PIL.Image.fromarray((arr * 255).astype(np.uint8, order="C"))
     img.save(fname)
 
 
@@ -792,9 +766,18 @@ def fname_parent(filepath, levels=1):
         common = os.path.dirname(common)
     return os.path.relpath(filepath, common)
     
-def zipdir(src_dirname, out_fname, include_list=None):
+# files that are already compressed (or close to incompressible)
+_ZIP_STORED_EXTS = (".pth", ".png", ".jpg", ".jpeg", ".zip", ".gz")
+
+def zipdir(src_dirname, out_fname, include_list=None, compression=None):
+    """Zip a folder.
+
+    If compression is None, already compressed files (checkpoints, images)
+    are stored as is and everything else is deflated.
+    """
     zipf = zipfile.ZipFile(out_fname, 'w', 
-                           zipfile.ZIP_DEFLATED)
+                           zipfile.ZIP_DEFLATED,
+                           allowZip64=True, compresslevel=1)
     # ziph is zipfile handle
     for root, dirs, files in os.walk(src_dirname):
         for file in files:
@@ -805,7 +788,13 @@ def zipdir(src_dirname, out_fname, include_list=None):
             abs_path = os.path.join(root, file)
             rel_path = fname_parent(abs_path)
             print(rel_path)
-            zipf.write(abs_path, rel_path)
+            compress_type = compression
+            if compress_type is None:
+                if file.lower().endswith(_ZIP_STORED_EXTS):
+                    compress_type = zipfile.ZIP_STORED
+                else:
+                    compress_type = zipfile.ZIP_DEFLATED
+            zipf.write(abs_path, rel_path, compress_type=compress_type)
 
     zipf.close()
 
@@ -847,10 +836,58 @@ def get_exp_meta(exp_dict, savedir_base, mode=None, remove_keys=None,
     return exp_meta
 
 
-def save_json(fname, data):
+def save_json(fname, data, pretty=True):
+    """Save data in json format.
+
+    Uses orjson when it is installed, which indents with 2 spaces instead
+    of 4, and sorts int keys as strings ("10" before "2") where the json
+    module sorts them numerically. Data holding NaN or Infinity always goes
+    through the json module so that these values are written as
+    NaN/Infinity rather than null.
+    """
     create_dirs(fname)
+    _write_json(fname, data, pretty)
+
+
+def save_json_bulk(items, pretty=True):
+    """Save many (fname, data) pairs, checking each folder only once."""
+    _save_bulk(items, _write_json, pretty)
+
+
+def _has_nonfinite(data):
+    """Check if data holds a NaN or Infinity float."""
+    if isinstance(data, dict):
+        return any(_has_nonfinite(v) for v in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_nonfinite(v) for v in data)
+    if isinstance(data, (float, np.floating)):
+        return not np.isfinite(data)
+    if isinstance(data, np.ndarray) and data.dtype.kind in "fc":
+        return not np.isfinite(data).all()
+    return False
+
+
+def _write_json(fname, data, pretty):
+    # orjson writes non-finite floats as null, which would change the data
+    # (and the exp_id of a reloaded exp_dict)
+    if orjson is not None and not _has_nonfinite(data):
+        option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS |
+                  orjson.OPT_SERIALIZE_NUMPY)
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            raw = orjson.dumps(data, option=option)
+        except orjson.JSONEncodeError:
+            # let the json module handle (or report) what orjson can't
+            pass
+        else:
+            with open(fname, "wb") as json_file:
+                json_file.write(raw)
+            return
+
     with open(fname, "w") as json_file:
-        json.dump(data, json_file, indent=4, sort_keys=True)
+        json.dump(data, json_file, indent=4 if pretty else None,
+                  sort_keys=True)
 
 
 def flatten_dict(exp_dict):
@@ -866,19 +903,8 @@ def flatten_dict(exp_dict):
 
 # TODO: Delete tmp files?
 def t2n(x):
-    if isinstance(x, (int, float)):
-        return x
-    if isinstance(x, torch.autograd.Variable):
-        x = x.cpu().data.numpy()
-
-    if isinstance(x, (torch.cuda.FloatTensor, torch.cuda.IntTensor,
-                      torch.cuda.LongTensor, torch.cuda.DoubleTensor)):
-        x = x.cpu().numpy()
-
-    if isinstance(x, (torch.FloatTensor, torch.IntTensor, torch.LongTensor,
-                      torch.DoubleTensor)):
-        x = x.numpy()
-
+    if torch.is_tensor(x):
+        return x.detach().cpu().numpy()
     return x
 
 # def read_text(fname):
@@ -888,33 +914,54 @@ def t2n(x):
 #     return lines
 
 def shrink2roi(img, roi):
-    ind = np.where(roi != 0)
+    # non-zero rows and columns, without materializing the indices
+    other_axes = tuple(range(2, roi.ndim))
+    rows = np.any(roi, axis=(1,) + other_axes)
+    cols = np.any(roi, axis=(0,) + other_axes)
+    if not rows.any():
+        raise ValueError('roi is empty')
 
-    y_min = min(ind[0])
-    y_max = max(ind[0])
+    y_min = np.argmax(rows)
+    y_max = len(rows) - 1 - np.argmax(rows[::-1])
 
-    x_min = min(ind[1])
-    x_max = max(ind[1])
+    x_min = np.argmax(cols)
+    x_max = len(cols) - 1 - np.argmax(cols[::-1])
 
     return img[y_min:y_max, x_min:x_max]
 
 def hash_dict(dictionary):
     """Create a hash for a dictionary."""
-    dict2hash = ""
     if not isinstance(dictionary, dict):
         raise ValueError('dictionary is not a dict')
-    for k in sorted(dictionary.keys()):
-        if isinstance(dictionary[k], dict):
-            v = hash_dict(dictionary[k])
-        else:
-            v = dictionary[k]
+    # collect the parts and join them once instead of growing a string;
+    # nested dicts contribute their own hexdigest to keep exp_ids
+    parts = []
+    for k, v in sorted(dictionary.items()):
+        if isinstance(v, dict):
+            v = hash_dict(v)
 
-        dict2hash += "%s_%s_" % (str(k), str(v))
+        parts.append("%s_%s_" % (str(k), str(v)))
 
-    return hashlib.md5(dict2hash.encode()).hexdigest()
+    return _HASH("".join(parts).encode()).hexdigest()
 
 def hash_str(str):
-    return hashlib.md5(str.encode()).hexdigest()
+    return _HASH(str.encode()).hexdigest()
+
+def set_hash_backend(name="md5"):
+    """Set the hash function used by hash_dict and hash_str.
+
+    md5 is the default since exp_ids of existing experiments were created
+    with it. "xxh128" (requires xxhash) is much faster but gives different
+    exp_ids, so use it only for new savedir_bases.
+    """
+    global _HASH
+    if name == "md5":
+        _HASH = hashlib.md5
+    elif name == "xxh128":
+        import xxhash
+        _HASH = xxhash.xxh128
+    else:
+        raise ValueError("hash backend %s not supported" % name)
 
 
 def create_dirs(fname):
@@ -923,10 +970,13 @@ def create_dirs(fname):
     if "/" not in fname:
         return
 
-    # If the folder do not exist, create it
-    if not os.path.exists(os.path.dirname(fname)):
-        print(os.path.dirname(fname))
-        os.makedirs(os.path.dirname(fname))
+    # If the folder do not exist, create it. A single stat is all it costs
+    # when it already exists; exist_ok covers another worker creating it
+    # in between
+    dirname = os.path.dirname(fname)
+    if not os.path.exists(dirname):
+        print(dirname)
+        os.makedirs(dirname, exist_ok=True)
 
 
 def wait_until_safe2load(path, patience=10):
@@ -1016,9 +1066,7 @@ def torch_save(fname, obj, safe_flag=True):
         save_json(fname_writing, {"writing": 1})
 
     torch.save(obj, fname_tmp)
-    if os.path.exists(fname):
-        os.remove(fname)
-    os.rename(fname_tmp, fname)
+    os.replace(fname_tmp, fname)
 
     if safe_flag:
         save_json(fname_writing, {"writing": 0})
@@ -1031,29 +1079,55 @@ def time2mins(time_taken):
 
 
 class Parallel:
-    """Class for run a function in parallel."""
+    """Class for run a function in parallel.
+
+    backend is "thread" (default) or "process"; the latter needs func and
+    its arguments to be picklable. With the thread backend and no
+    max_workers, every task added before run() gets its own worker so
+    tasks that wait on each other can't deadlock. Unlike the daemon
+    threads used before, workers are waited for at interpreter exit, so
+    call close().
+    """
 
-    def __init__(self):
-        self.threadList = []
+    def __init__(self, max_workers=None, backend="thread"):
+        if backend not in ["thread", "process"]:
+            raise ValueError("backend %s not supported" % backend)
+        self.max_workers = max_workers
+        self.backend = backend
+        self.executorList = []
+        self.taskList = []
+        self.futureList = []
         self.count = 0
 
     def add(self, func,  *args):
         """Add a funtion."""
-        self.threadList += [
-            threading.Thread(target=func, name="thread-%d"%self.count,
-                             args=args)]
+        self.taskList += [(func, args)]
         self.count += 1
 
     def run(self):
-        for thread in self.threadList:
-            thread.daemon = True
-            print("  > Starting thread %s" % thread.name)
-            thread.start()
+        print("  > Starting %d tasks" % len(self.taskList))
+        if not self.taskList:
+            return
+
+        if self.backend == "thread":
+            executor = ThreadPoolExecutor(
+                self.max_workers or len(self.taskList))
+        else:
+            executor = ProcessPoolExecutor(self.max_workers)
+        self.executorList += [executor]
+
+        for func, args in self.taskList:
+            self.futureList += [executor.submit(func, *args)]
+        self.taskList = []
 
     def close(self):
-        for thread in self.threadList:
-            print("  > Joining thread %s" % thread.name)
-            thread.join()
+        print("  > Joining %d tasks" % len(self.futureList))
+        try:
+            for future in as_completed(self.futureList):
+                future.result()
+        finally:
+            for executor in self.executorList:
+                executor.shutdown()
 
 
 def subprocess_call(cmd_string):
@@ -1065,27 +1139,88 @@ def extract_fname(directory):
     return ntpath.basename(directory)
 
 
+def _copy_file_range(src, dst):
+    """Copy a file in the kernel (a reflink on btrfs/xfs)."""
+    if not hasattr(os, "copy_file_range"):
+        return shutil.copy2(src, dst)
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            n_left = os.fstat(fsrc.fileno()).st_size
+            while n_left > 0:
+                n_copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(),
+                                              n_left)
+                if n_copied == 0:
+                    # src shrank or the kernel gave up; don't leave dst
+                    # truncated
+                    raise OSError("copy_file_range stopped early")
+                n_left -= n_copied
+    except OSError:
+        # e.g. not supported by the filesystem
+        return shutil.copy2(src, dst)
+
+    shutil.copystat(src, dst)
+    return dst
+
+
+def _delete_extraneous(src_dir, dst_dir, ignore):
+    """Delete what rsync --delete would from dst_dir.
+
+    Entries matched by ignore are kept, like rsync does for excluded files
+    unless --delete-excluded is given. Symlinks and entries whose type
+    changed are removed too so that copytree can recreate them.
+    """
+    dst_names = os.listdir(dst_dir)
+    ignored = ignore(dst_dir, dst_names)
+    for name in dst_names:
+        if name in ignored:
+            continue
+
+        src = os.path.join(src_dir, name)
+        dst = os.path.join(dst_dir, name)
+        src_isdir = os.path.isdir(src) and not os.path.islink(src)
+        dst_isdir = os.path.isdir(dst) and not os.path.islink(dst)
+
+        if (not os.path.lexists(src) or os.path.islink(src) or
+                os.path.islink(dst) or src_isdir != dst_isdir):
+            if dst_isdir:
+                shutil.rmtree(dst)
+            else:
+                os.remove(dst)
+        elif dst_isdir:
+            _delete_extraneous(src, dst, ignore)
+
+
 def copy_code(src_path, dst_path, verbose=1):
     """Copy code."""
     assert src_path[-1] == "/"
-    time.sleep(.5)  # TODO: Why?
+    if not os.path.isdir(src_path):
+        raise ValueError("Copying code failed: %s is not a folder" % src_path)
 
     if verbose:
         print("  > Copying code from %s to %s" % (src_path, dst_path))
-    # Create destination folder
-    create_dirs(dst_path + "/tmp")  # TODO: Why?
 
-    rsync_code = "rsync -av -r -q  --delete-before --exclude='.git/' " \
-                 " --exclude='*.pyc' --exclude='__pycache__/' %s %s" % (
-                    src_path, dst_path)
+    ignore_patterns = shutil.ignore_patterns('.git', '*.pyc', '__pycache__')
+    dst_realpath = os.path.realpath(dst_path)
+
+    def ignore(dirname, names):
+        # dst_path may live inside src_path (e.g. a savedir under the
+        # project), never copy it into itself
+        ignored = set(ignore_patterns(dirname, names))
+        for name in names:
+            if os.path.realpath(os.path.join(dirname, name)) == dst_realpath:
+                ignored.add(name)
+        return ignored
 
     try:
-        subprocess_call(rsync_code)
-    except subprocess.CalledProcessError as e:
-        raise ValueError("Ping stdout output:\n", e.output)  # TODO: Through an error?
+        # like rsync --delete-before
+        if os.path.isdir(dst_path):
+            _delete_extraneous(src_path, dst_path, ignore)
 
-    # print("  > Code copied\n")
-    time.sleep(.5)  # TODO: Delete?
+        shutil.copytree(src_path, dst_path, symlinks=True, ignore=ignore,
+                        copy_function=_copy_file_range, dirs_exist_ok=True)
+    except (shutil.Error, OSError) as e:
+        raise ValueError("Copying code failed:\n", e)
 
 @contextlib.contextmanager
 def random_seed(seed):
@@ -1189,11 +1324,21 @@ def join_df_list(df_list):
 #     with open(fname, "rb") as f:
 #         return pickle.load(f)
 
-def load_json(fname, decode=None):
-    with open(fname, "r") as json_file:
-        d = json.load(json_file)
+_LONG_DIGITS = re.compile(rb"\d{19,}")
 
-    return d
+def load_json(fname, decode=None):
+    with open(fname, "rb") as json_file:
+        raw = json_file.read()
+
+    # orjson reads integers wider than 64 bits as floats; a run of 19+
+    # digits (possibly a false positive) sends the file to the json module
+    if orjson is not None and _LONG_DIGITS.search(raw) is None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # files written by the json module may contain NaN/Infinity
+            pass
+    return json.loads(raw)
 
 def read_text(fname):
     # READS LINES